@@ -1,129 +1,150 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-
-# --- Configuration ---
-THERMO_FILE = 'output/thermo_data.dat'
-OUTPUT_DIR = 'output/'
-
-# IMPORTANT: Based on your thermo_data.dat content ("Loop time... with 256 atoms")
-NUM_ATOMS = 256 
-THERMO_COLUMNS = ['Step', 'Temp', 'PotEng', 'TotEng', 'Press', 'Density']
-
-
-def load_and_clean_thermo_data_robust(filepath):
-    """
-    Loads LAMMPS thermo data by robustly finding all data blocks based on the 'Step' header.
-    """
-    data_blocks = []
-    
-    # 1. Read the entire file and find the indices of all header lines
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-        
-    header_indices = [i for i, line in enumerate(lines) if line.strip().startswith('Step')]
-    
-    if not header_indices:
-        raise ValueError("Could not find any 'Step' header lines in the thermo file.")
-
-    # 2. Extract and process each data block
-    for header_index in header_indices:
-        
-        # Determine the start of the data (line after the header)
-        data_start_index = header_index + 1
-        
-        # Slice the lines corresponding to the current data block
-        # We stop when the line is non-numeric (e.g., comments, performance report, or end of file)
-        current_data_lines = []
-        for i in range(data_start_index, len(lines)):
-            line = lines[i].strip()
-            # Check if the line is a numerical data line
-            if line and line.split()[0].isdigit():
-                current_data_lines.append(line)
-            else:
-                break # End of current data block
-
-        if current_data_lines:
-            # Join lines back into a single string block
-            data_string = '\n'.join(current_data_lines)
-            
-            # Read the block into a temporary DataFrame
-            temp_df = pd.read_csv(
-                pd.io.common.StringIO(data_string), 
-                sep=r'\s+',              # Robustly handle multiple spaces as separator
-                names=THERMO_COLUMNS,    # Use predefined column names
-                index_col=False
-            )
-            data_blocks.append(temp_df)
-
-    if not data_blocks:
-        raise ValueError("Found headers but could not extract any valid numerical data blocks.")
-
-    # 3. Concatenate all blocks and finalize cleaning
-    df = pd.concat(data_blocks, ignore_index=True)
-    
-    # Remove duplicates (which occur at the beginning of the heating stage)
-    df = df.drop_duplicates(subset=['Step'], keep='first')
-    
-    # Add per-atom features (PotEng is Total Potential Energy)
-    df['PE_per_atom'] = df['PotEng'] / NUM_ATOMS
-    df['E_per_atom'] = df['TotEng'] / NUM_ATOMS
-    
-    return df
-
-def plot_thermo_data(df):
-    """Plots the primary thermodynamic features for melting point detection."""
-    
-    # Filter for the heating phase (Step 20000 onwards) for clearer view of melting
-    heating_df = df[df['Step'] >= 20000].copy()
-    
-    fig, axes = plt.subplots(3, 1, figsize=(10, 12), sharex=True)
-    
-    # --- Plot 1: Potential Energy (PE) per atom vs. Temperature ---
-    axes[0].plot(heating_df['Temp'], heating_df['PE_per_atom'], label='PE/atom', color='blue', marker='o', markersize=3)
-    axes[0].set_ylabel('Potential Energy per Atom (eV/atom)')
-    axes[0].set_title(f'1. Potential Energy vs. Temperature (Heating Phase) - {NUM_ATOMS} Atoms')
-    axes[0].grid(True, linestyle='--', alpha=0.6)
-    
-    # --- Plot 2: Density vs. Temperature ---
-    axes[1].plot(heating_df['Temp'], heating_df['Density'], label='Density', color='green', marker='o', markersize=3)
-    axes[1].set_ylabel('Density ($g/cm^3$)')
-    axes[1].set_title('2. Density vs. Temperature (Phase Change)')
-    axes[1].grid(True, linestyle='--', alpha=0.6)
-
-    # --- Plot 3: Pressure vs. Temperature ---
-    axes[2].plot(heating_df['Temp'], heating_df['Press'], label='Pressure', color='orange', marker='o', markersize=3)
-    axes[2].set_ylabel('Pressure (Bar)')
-    axes[2].set_xlabel('Temperature (K)')
-    axes[2].set_title('3. Pressure vs. Temperature')
-    axes[2].grid(True, linestyle='--', alpha=0.6)
-
-    plt.tight_layout()
-    plt.savefig(OUTPUT_DIR + 'melting_curve_analysis.png')
-    plt.show()
-
-# --- Main Execution ---
-if __name__ == '__main__':
-    print(f"Loading data from {THERMO_FILE}...")
-    
-    import os
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-        
-    try:
-        data_df = load_and_clean_thermo_data_robust(THERMO_FILE)
-        
-        # Save cleaned data 
-        data_df.to_csv(OUTPUT_DIR + 'cleaned_thermo_data.csv', index=False)
-        print(f"Data successfully cleaned and saved to cleaned_thermo_data.csv. Shape: {data_df.shape}")
-        
-        plot_thermo_data(data_df)
-        print(f"Plots saved to {OUTPUT_DIR}melting_curve_analysis.png")
-        
-        print("\n--- Step 1.1 Complete ---")
-        print("NEXT STEP: Use this cleaned data for ML-assisted melting point analysis.")
-        
-    except FileNotFoundError:
-        print(f"ERROR: File not found at {THERMO_FILE}. Check your directory structure.")
-    except Exception as e:
+import os
+
+import pandas as pd
+import numpy as np
+import matplotlib
+if not os.environ.get('DISPLAY'):
+    matplotlib.use('Agg')  # headless run: skip GUI backend and event-loop setup
+import matplotlib.pyplot as plt
+
+# --- Configuration ---
+THERMO_FILE = 'output/thermo_data.dat'
+OUTPUT_DIR = 'output/'
+
+# IMPORTANT: Based on your thermo_data.dat content ("Loop time... with 256 atoms")
+NUM_ATOMS = 256
+INV_ATOMS = np.float64(1.0) / np.float64(NUM_ATOMS)  # reciprocal for per-atom features
+THERMO_COLUMNS = ['Step', 'Temp', 'PotEng', 'TotEng', 'Press', 'Density']
+
+
+def load_and_clean_thermo_data_robust(filepath):
+    """
+    Loads LAMMPS thermo data by parsing the whole file in one vectorized pass.
+    """
+    # 1. Parse the entire file once with the C engine. Every 6-token line becomes
+    #    a row of strings; lines with a different token count (log messages,
+    #    performance report) are skipped by the parser itself.
+    df = pd.read_csv(
+        filepath,
+        sep=r'\s+',              # Robustly handle multiple spaces as separator
+        names=THERMO_COLUMNS,    # Use predefined column names
+        header=None,
+        dtype=str,
+        engine='c',
+        on_bad_lines='skip',
+        skip_blank_lines=True,
+        memory_map=True,         # Let the parser stream the mmapped file, no read-buffer copies
+        index_col=False
+    )
+
+    # 2. Convert every column to numeric in a single pass; text rows (the
+    #    repeated 'Step ...' header lines) coerce to NaN and feed the mask,
+    #    so the strings are tokenized exactly once. Require all six columns
+    #    numeric: short log lines with a leading number (e.g. "128 settings
+    #    made for type/fraction") get NaN-padded by the parser and must not
+    #    slip through as data rows.
+    numeric = df.apply(pd.to_numeric, errors='coerce')
+    mask = numeric.notna().all(axis=1)
+
+    if not mask.any():
+        raise ValueError("Could not extract any valid numerical data rows from the thermo file.")
+
+    # 3. Materialize the surviving rows as one contiguous float64 buffer and
+    #    build the final frame from it in a single allocation
+    values = numeric.to_numpy(dtype=np.float64)[mask.to_numpy()]
+    df = pd.DataFrame(values, columns=THERMO_COLUMNS)
+    df['Step'] = df['Step'].astype('int64')
+
+    # Remove duplicates (which occur at the beginning of the heating stage).
+    # np.unique sorts the int64 Step array in C; keeping the first occurrence
+    # of each step is cheaper than pandas' hash-based drop_duplicates.
+    _, first_idx = np.unique(df['Step'].to_numpy(), return_index=True)
+    df = df.iloc[np.sort(first_idx)]
+    
+    # Add per-atom features (PotEng is Total Potential Energy).
+    # Multiply by the precomputed reciprocal on raw numpy arrays: cheaper than
+    # an elementwise divide and skips pandas index alignment.
+    df['PE_per_atom'] = df['PotEng'].to_numpy() * INV_ATOMS
+    df['E_per_atom'] = df['TotEng'].to_numpy() * INV_ATOMS
+    
+    return df
+
+def plot_thermo_data(df):
+    """Plots the primary thermodynamic features for melting point detection."""
+    
+    # Filter for the heating phase (Step 20000 onwards) for clearer view of melting.
+    # A boolean mask over the raw numpy columns avoids copying the whole frame
+    # just to plot four of its columns.
+    heating = df['Step'].to_numpy() >= 20000
+    temp = df['Temp'].to_numpy()[heating]
+    pe_per_atom = df['PE_per_atom'].to_numpy()[heating]
+    density = df['Density'].to_numpy()[heating]
+    press = df['Press'].to_numpy()[heating]
+
+    # Downsample long runs before plotting: past ~2000 points the markers
+    # overlap anyway and matplotlib's per-point setup dominates render time.
+    if len(temp) > 2000:
+        stride = len(temp) // 2000
+        temp = temp[::stride]
+        pe_per_atom = pe_per_atom[::stride]
+        density = density[::stride]
+        press = press[::stride]
+
+    fig, axes = plt.subplots(3, 1, figsize=(10, 12), sharex=True)
+
+    # --- Plot 1: Potential Energy (PE) per atom vs. Temperature ---
+    axes[0].plot(temp, pe_per_atom, label='PE/atom', color='blue', marker='o', markersize=3)
+    axes[0].set_ylabel('Potential Energy per Atom (eV/atom)')
+    axes[0].set_title(f'1. Potential Energy vs. Temperature (Heating Phase) - {NUM_ATOMS} Atoms')
+    axes[0].grid(True, linestyle='--', alpha=0.6)
+    
+    # --- Plot 2: Density vs. Temperature ---
+    axes[1].plot(temp, density, label='Density', color='green', marker='o', markersize=3)
+    axes[1].set_ylabel('Density ($g/cm^3$)')
+    axes[1].set_title('2. Density vs. Temperature (Phase Change)')
+    axes[1].grid(True, linestyle='--', alpha=0.6)
+
+    # --- Plot 3: Pressure vs. Temperature ---
+    axes[2].plot(temp, press, label='Pressure', color='orange', marker='o', markersize=3)
+    axes[2].set_ylabel('Pressure (Bar)')
+    axes[2].set_xlabel('Temperature (K)')
+    axes[2].set_title('3. Pressure vs. Temperature')
+    axes[2].grid(True, linestyle='--', alpha=0.6)
+
+    plt.tight_layout()
+    plt.savefig(OUTPUT_DIR + 'melting_curve_analysis.png')
+    if os.environ.get('DISPLAY'):
+        plt.show()
+    plt.close(fig)  # free the figure memory once it is on disk
+
+# --- Main Execution ---
+if __name__ == '__main__':
+    print(f"Loading data from {THERMO_FILE}...")
+
+    if not os.path.exists(OUTPUT_DIR):
+        os.makedirs(OUTPUT_DIR)
+        
+    try:
+        data_df = load_and_clean_thermo_data_robust(THERMO_FILE)
+        
+        # Save cleaned data (Parquet keeps the columns binary and typed, so the
+        # next stage skips re-tokenizing CSV text; fall back to CSV if no
+        # parquet engine is installed)
+        try:
+            data_df.to_parquet(OUTPUT_DIR + 'cleaned_thermo_data.parquet')
+            saved_name = 'cleaned_thermo_data.parquet'
+        except ImportError:
+            data_df.to_csv(OUTPUT_DIR + 'cleaned_thermo_data.csv', index=False)
+            saved_name = 'cleaned_thermo_data.csv'
+        print(f"Data successfully cleaned and saved to {saved_name}. Shape: {data_df.shape}")
+        
+        plot_thermo_data(data_df)
+        print(f"Plots saved to {OUTPUT_DIR}melting_curve_analysis.png")
+        
+        print("\n--- Step 1.1 Complete ---")
+        print("NEXT STEP: Use this cleaned data for ML-assisted melting point analysis.")
+        
+    except FileNotFoundError:
+        print(f"ERROR: File not found at {THERMO_FILE}. Check your directory structure.")
+    except Exception as e:
         print(f"A critical error occurred during processing: {e}")
\ No newline at end of file
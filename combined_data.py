@@ -1,92 +1,119 @@
-import pandas as pd
-import numpy as np
-import io
-
-# --- Configuration ---
-CLEANED_THERMO_FILE = 'output/cleaned_thermo_data.csv'
-STRUCTURAL_FEATURES_FILE = 'output/structural_features.txt'
-FINAL_ML_DATA_FILE = 'output/final_ml_dataset.csv'
-
-# Based on your simulation details ("256 atoms")
-NUM_ATOMS = 256 
-
-def combine_and_create_features():
-    """Combines thermo data with structural data to create the final ML dataset."""
-    
-    # 1. Load Thermodynamic Data
-    try:
-        df_thermo = pd.read_csv(CLEANED_THERMO_FILE)
-        print(f"Loaded thermodynamic data (Shape: {df_thermo.shape})")
-    except FileNotFoundError:
-        print(f"ERROR: Cleaned thermo file not found at {CLEANED_THERMO_FILE}. Check your path.")
-        return
-
-    # 2. Load Structural Data (CORRECTED MAPPING based on file structure)
-    
-    # Define columns based EXACTLY on your file header:
-    STRUCT_COLS = [
-        'N_bcc',      # CommonNeighborAnalysis.counts.BCC
-        'N_fcc',      # CommonNeighborAnalysis.counts.FCC
-        'N_hcp',      # CommonNeighborAnalysis.counts.HCP
-        'N_other',    # CommonNeighborAnalysis.counts.OTHER
-        'Frame',      # OVITO Frame index
-        'Timestep'    # LAMMPS Step number (0, 1000, 2000...)
-    ]
-    
-    try:
-        # Read the file content first to strip the starting '#' from the header line
-        with open(STRUCTURAL_FEATURES_FILE, 'r') as f:
-            content = f.read()
-        
-        # Replace the initial '#' with a space so pandas reads the header correctly
-        content = content.replace('#', '', 1) 
-        
-        # Read the cleaned content into a DataFrame
-        df_struct = pd.read_csv(
-            io.StringIO(content),             # Read from the string content
-            sep=r'\s+',                       # Robustly handle multiple spaces as separator
-            header=0,                         # Header is the first line
-            names=STRUCT_COLS,                # Use our explicit column names
-            index_col=False
-        )
-        print(f"Loaded structural data (Shape: {df_struct.shape})")
-    
-    except FileNotFoundError:
-        print(f"ERROR: Structural features file not found at {STRUCTURAL_FEATURES_FILE}. Check your path.")
-        return
-    except Exception as e:
-        print(f"Error loading structural data: {e}. Ensure the number of columns is correct.")
-        return
-
-    # 3. Calculate the key ML Label Feature
-    # The sum of all ordered phases (FCC, HCP, BCC) gives the solid atom count.
-    df_struct['N_solid'] = df_struct['N_fcc'] + df_struct['N_hcp'] + df_struct['N_bcc']
-    
-    # The primary Y-label for the ML model:
-    df_struct['Fraction_Solid'] = df_struct['N_solid'] / NUM_ATOMS
-
-    # 4. Merge the two DataFrames on the correct key (Step/Timestep)
-    df_final = pd.merge(
-        df_thermo, 
-        df_struct[['Timestep', 'Fraction_Solid']], 
-        left_on='Step',          # Column in thermo data
-        right_on='Timestep',     # Column in structural data (the LAMMPS step number)
-        how='inner'              # Use 'inner' to keep only matching rows
-    )
-
-    # Drop the redundant 'Timestep' column
-    df_final = df_final.drop(columns=['Timestep'])
-
-    # 5. Save the final ML dataset
-    # Ensure the output directory exists
-    import os
-    os.makedirs(os.path.dirname(FINAL_ML_DATA_FILE), exist_ok=True)
-    
-    df_final.to_csv(FINAL_ML_DATA_FILE, index=False)
-    print(f"\nSuccessfully created FINAL ML DATASET: {FINAL_ML_DATA_FILE} (Shape: {df_final.shape})")
-    print("Columns available for ML: Step, Temp, PE_per_atom, Density, Fraction_Solid, etc.")
-    
-    return df_final
-
-if __name__ == '__main__':
+import pandas as pd
+import numpy as np
+import os
+
+# --- Configuration ---
+CLEANED_THERMO_PARQUET = 'output/cleaned_thermo_data.parquet'
+CLEANED_THERMO_FILE = 'output/cleaned_thermo_data.csv'
+STRUCTURAL_FEATURES_FILE = 'output/structural_features.txt'
+FINAL_ML_DATA_FILE = 'output/final_ml_dataset.csv'
+
+# Based on your simulation details ("256 atoms")
+NUM_ATOMS = 256
+INV_ATOMS = np.float64(1.0) / np.float64(NUM_ATOMS)  # reciprocal for the solid fraction
+
+def combine_and_create_features():
+    """Combines thermo data with structural data to create the final ML dataset."""
+    
+    # 1. Load Thermodynamic Data
+    # Prefer the Parquet output (binary, typed columns, no re-tokenization);
+    # otherwise read the CSV, using pyarrow's multithreaded parser when it is
+    # installed and falling back to the pandas parser.
+    try:
+        df_thermo = None
+        if os.path.exists(CLEANED_THERMO_PARQUET):
+            try:
+                df_thermo = pd.read_parquet(CLEANED_THERMO_PARQUET)
+            except ImportError:
+                # Stale parquet from an environment that had an engine; the
+                # current run wrote a CSV instead, so read that below.
+                pass
+        if df_thermo is None:
+            try:
+                import pyarrow.csv as pacsv
+                df_thermo = pacsv.read_csv(CLEANED_THERMO_FILE).to_pandas(self_destruct=True)
+            except ImportError:
+                df_thermo = pd.read_csv(CLEANED_THERMO_FILE, dtype={'Step': 'int64'})
+        print(f"Loaded thermodynamic data (Shape: {df_thermo.shape})")
+    except FileNotFoundError:
+        print(f"ERROR: Cleaned thermo file not found at {CLEANED_THERMO_FILE}. Check your path.")
+        return
+
+    # 2. Load Structural Data (CORRECTED MAPPING based on file structure)
+    
+    # Define columns based EXACTLY on your file header:
+    STRUCT_COLS = [
+        'N_bcc',      # CommonNeighborAnalysis.counts.BCC
+        'N_fcc',      # CommonNeighborAnalysis.counts.FCC
+        'N_hcp',      # CommonNeighborAnalysis.counts.HCP
+        'N_other',    # CommonNeighborAnalysis.counts.OTHER
+        'Frame',      # OVITO Frame index
+        'Timestep'    # LAMMPS Step number (0, 1000, 2000...)
+    ]
+    
+    try:
+        # Let pandas parse the file by path: the '#'-prefixed header line is
+        # skipped directly, with no full-file string copy or StringIO detour.
+        df_struct = pd.read_csv(
+            STRUCTURAL_FEATURES_FILE,
+            sep=r'\s+',                       # Robustly handle multiple spaces as separator
+            comment='#',                      # Drop the OVITO header / comment lines
+            header=None,
+            skiprows=1,
+            names=STRUCT_COLS,                # Use our explicit column names
+            engine='c',
+            # Counts are bounded by NUM_ATOMS, so int32 halves the bytes the
+            # later sum and merge-key hashing have to touch.
+            dtype={
+                'N_bcc': 'int32',
+                'N_fcc': 'int32',
+                'N_hcp': 'int32',
+                'N_other': 'int32',
+                'Frame': 'int32',
+                'Timestep': 'int64'
+            },
+            index_col=False
+        )
+        print(f"Loaded structural data (Shape: {df_struct.shape})")
+    
+    except FileNotFoundError:
+        print(f"ERROR: Structural features file not found at {STRUCTURAL_FEATURES_FILE}. Check your path.")
+        return
+    except Exception as e:
+        print(f"Error loading structural data: {e}. Ensure the number of columns is correct.")
+        return
+
+    # 3. Calculate the key ML Label Feature
+    # The sum of all ordered phases (FCC, HCP, BCC) gives the solid atom count.
+    # One numpy row-sum plus a scalar multiply, instead of chained Series ops
+    # that each allocate an intermediate.
+    n_solid = df_struct[['N_fcc', 'N_hcp', 'N_bcc']].to_numpy().sum(axis=1)
+    df_struct['N_solid'] = n_solid
+
+    # The primary Y-label for the ML model:
+    df_struct['Fraction_Solid'] = n_solid * INV_ATOMS
+
+    # 4. Attach Fraction_Solid via a Timestep -> value lookup.
+    # Timestep is unique per OVITO frame, so a Series.map needs only one hash
+    # table (instead of merge hashing both sides) and no frame concatenation.
+    frac_by_step = pd.Series(
+        df_struct['Fraction_Solid'].to_numpy(),
+        index=df_struct['Timestep'].to_numpy()
+    )
+    df_thermo['Fraction_Solid'] = df_thermo['Step'].map(frac_by_step)
+
+    # Keep only the steps that have a structural frame (the old inner merge)
+    df_final = df_thermo.dropna(subset=['Fraction_Solid']).reset_index(drop=True)
+
+    # 5. Save the final ML dataset
+    # Ensure the output directory exists
+    os.makedirs(os.path.dirname(FINAL_ML_DATA_FILE), exist_ok=True)
+    
+    df_final.to_csv(FINAL_ML_DATA_FILE, index=False)
+    print(f"\nSuccessfully created FINAL ML DATASET: {FINAL_ML_DATA_FILE} (Shape: {df_final.shape})")
+    print("Columns available for ML: Step, Temp, PE_per_atom, Density, Fraction_Solid, etc.")
+    
+    return df_final
+
+if __name__ == '__main__':
     combine_and_create_features()
\ No newline at end of file